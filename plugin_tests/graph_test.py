@@ -1,15 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import httmock
 import json
+import requests
 import six
 import os
+import time
 import yaml
 import pyaml
 from pprint import pprint
 from tests import base
 import girder
 from girder.constants import ROOT_DIR
+from girder.plugins.jobs.constants import JobStatus
 
 
 def setUpModule():
@@ -43,6 +47,42 @@ class GraphTestCase(base.TestCase):
 
         resp = self.request('/spec/ingest', user=self.admin, method='PUT')
                             
+    def _loadFbp(self, name='fakeplant_fbp.json'):
+        """Load an FBP graph from the test data."""
+        path = os.path.join(ROOT_DIR, 'plugins', 'cis', 'plugin_tests', name)
+        with open(path, 'r') as fp:
+            return json.load(fp)
+
+    def _postGraph(self, path, data):
+        """POST FBP content to a graph endpoint as the regular user."""
+        graph = {'name': 'test', 'content': data}
+        return self.request(path, user=self.user, method='POST',
+                            isJson=False, type='application/json',
+                            body=json.dumps(graph))
+
+    def _waitFor(self, condition, timeout=10):
+        """Poll until work done by the events daemon satisfies condition."""
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail('Timed out waiting for the events daemon')
+            time.sleep(0.1)
+
+    @httmock.urlmatch(path=r'^/apis/batch/v1/namespaces/hub/jobs(/.*)?$')
+    def mockKubernetes(self, url, request):
+        self.k8sRequests.append(request.method)
+        if request.method == 'GET':
+            # The job does not exist yet
+            return httmock.response(404, {'message': 'not found'},
+                                    {'content-type': 'application/json'},
+                                    None, 5, request)
+        return httmock.response(201, {'kind': 'Job'},
+                                {'content-type': 'application/json'},
+                                None, 5, request)
+
+    @httmock.urlmatch(path=r'^/apis/batch/v1/namespaces/hub/jobs(/.*)?$')
+    def mockKubernetesDown(self, url, request):
+        raise requests.exceptions.ConnectionError('Kubernetes is down')
 
     def testGraph(self):
         fbp_graph_file = os.path.join(ROOT_DIR, 'plugins', 'cis', 
@@ -72,10 +112,12 @@ class GraphTestCase(base.TestCase):
                             method='GET')
         self.assertStatus(resp, 200)
         self.assertEquals(resp.json['name'], 'renamed')
+        self.assertEquals(resp.json['content'], data)
 
         resp = self.request(path='/graph', method='GET', user=self.user)
         self.assertStatusOk(resp)
         self.assertEqual(len(resp.json), 1)
+        self.assertNotIn('content', resp.json[0])
 
         resp = self.request('/graph/%s' % graphId, user=self.admin,
                             method='DELETE')
@@ -112,6 +154,104 @@ class GraphTestCase(base.TestCase):
 
         self.assertEquals(goldyml, respyml)
 
+    def testConvertInvalid(self):
+        # Missing top-level section
+        data = self._loadFbp()
+        del data['connections']
+        self.assertStatus(self._postGraph('/graph/convert', data), 400)
+
+        # Unknown component
+        data = self._loadFbp()
+        key = next(k for k, p in data['processes'].items()
+                   if p['component'] not in ('inport', 'outport'))
+        data['processes'][key]['component'] = 'nosuchmodel'
+        self.assertStatus(self._postGraph('/graph/convert', data), 400)
+
+        # Process without a component
+        data = self._loadFbp()
+        del data['processes'][key]['component']
+        self.assertStatus(self._postGraph('/graph/convert', data), 400)
+
+        # Port without a label
+        data = self._loadFbp()
+        port_key = next(k for k, p in data['processes'].items()
+                        if p['component'] == 'inport')
+        data['processes'][port_key]['metadata'].pop('label', None)
+        self.assertStatus(self._postGraph('/graph/convert', data), 400)
+
+        # Connection to an unknown port
+        data = self._loadFbp()
+        data['connections'][0]['tgt']['port'] = 'nosuchport'
+        self.assertStatus(self._postGraph('/graph/convert', data), 400)
+
+    def testCompileCache(self):
+        from girder.plugins.cis.rest import graph as graph_rest
+
+        data = self._loadFbp()
+
+        compiled = []
+        compile_graph = graph_rest._compile_graph_impl
+
+        def countingCompile(content):
+            compiled.append(content)
+            return compile_graph(content)
+
+        graph_rest.clearGraphCache()
+        graph_rest._compile_graph_impl = countingCompile
+        try:
+            resp = self._postGraph('/graph/convert', data)
+            self.assertStatus(resp, 200)
+            self.assertEquals(len(compiled), 1)
+
+            # Executing the converted graph reuses the compiled YAML
+            self.k8sRequests = []
+            with httmock.HTTMock(self.mockKubernetes):
+                resp = self._postGraph('/graph/execute', data)
+                self.assertStatus(resp, 202)
+                self._waitFor(lambda: 'POST' in self.k8sRequests)
+            self.assertEquals(len(compiled), 1)
+
+            # Saving a spec invalidates the cache
+            spec = self.model('spec', 'cis').findOne()
+            self.model('spec', 'cis').save(spec)
+            self.assertEquals(len(graph_rest._compiled), 0)
+
+            resp = self._postGraph('/graph/convert', data)
+            self.assertStatus(resp, 200)
+            self.assertEquals(len(compiled), 2)
+        finally:
+            graph_rest._compile_graph_impl = compile_graph
+
+    def testExecute(self):
+        self.k8sRequests = []
+        with httmock.HTTMock(self.mockKubernetes):
+            resp = self._postGraph('/graph/execute', self._loadFbp())
+            self.assertStatus(resp, 202)
+            job_name = self.getBody(resp)
+            self.assertTrue(job_name.startswith('joeregular-'))
+
+            # The Kubernetes job is submitted from the events daemon
+            self._waitFor(lambda: 'POST' in self.k8sRequests)
+
+        job = self.model('job', 'jobs').findOne({'title': job_name})
+        self.assertIsNotNone(job)
+        self.assertEquals(job['type'], 'k8s.io/yggdrasil')
+        self.assertNotEquals(job['status'], JobStatus.ERROR)
+
+    def testExecuteSubmitFailure(self):
+        with httmock.HTTMock(self.mockKubernetesDown):
+            resp = self._postGraph('/graph/execute', self._loadFbp())
+            self.assertStatus(resp, 202)
+            job_name = self.getBody(resp)
+
+            def jobErrored():
+                job = self.model('job', 'jobs').findOne({'title': job_name})
+                return job['status'] == JobStatus.ERROR
+            self._waitFor(jobErrored)
+
+        job = self.model('job', 'jobs').findOne({'title': job_name})
+        self.assertIn('Kubernetes is down', ''.join(job['log']))
+
     def tearDown(self):
         self.model('user').remove(self.user)
         self.model('user').remove(self.admin)
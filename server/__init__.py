@@ -2,7 +2,7 @@
 """Girder plugin for Crops in Silico."""
 
 from rest import spec, graph
-from utils import ingest
+from utils import ingest, submitGraphJob
 from girder import events
 from girder.utility.model_importer import ModelImporter
 from girder.plugins.oauth.providers.github import GitHub
@@ -23,3 +23,6 @@ def load(info):
     ingest()
     GitHub.addScopes(['user:email', 'public_repo'])
     events.bind('oauth.auth_callback.after', 'cis', storeToken)
+    events.bind('cis.graph.submit', 'cis', submitGraphJob)
+    events.bind('model.spec.save.after', 'cis', graph.clearGraphCache)
+    events.bind('model.spec.remove', 'cis', graph.clearGraphCache)
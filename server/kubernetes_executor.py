@@ -317,19 +317,14 @@ class KubernetesJob(object):
                     str(return_val))
         return return_val
 
-    def get_error_message(self):
-        """Returns the error message if this job has failed, else returns None.
+    def get_pod_name(self):
+        """Returns the name of the pod running this job.
 
         Returns:
-            str: The error message if this job has failed, else None.
+            str: The pod name, "" if the job has no pods, or None if the
+                Kubernetes API could not be reached.
 
         """
-        # Reach out to Kubernetes API to retrieve job logs
-        # TODO: this has not been tested very thoroughly
-
-        LOGGER.debug('KubernetesJob.get_error_message')
-        LOGGER.debug(' >>> Reading error message for: ' + self.job_name)
-
         # Look up the pod_name for this job
         pods_url = 'https://' + \
             KubernetesJob.kubernetes_apiuri + \
@@ -340,22 +335,46 @@ class KubernetesJob(object):
         request_lambda = lambda: requests.get(\
             pods_url, headers=default_headers, verify=False)
         k8s_response = retry_request_until_ok(request_lambda, 3, 1)
+        if k8s_response is None:
+            return None
+
+        job_pods = k8s_response.json()
+        if len(job_pods['items']) <= 0:
+            return ""
+        # FIXME: We assume there is only one matching job
+        job_pod = job_pods['items'][0]
+        pod_name = job_pod['metadata']['name']
+        LOGGER.debug('>>> Got pod name: ' + pod_name)
+        return pod_name
+
+    def get_logs_url(self, pod_name):
+        """Returns the URL of the logs for the given pod."""
+        return 'https://' + \
+            KubernetesJob.kubernetes_apiuri + \
+            '/api/v1/namespaces/' + self.namespace + '/pods/' + pod_name + '/log'
+
+    def get_error_message(self):
+        """Returns the error message if this job has failed, else returns None.
+
+        Returns:
+            str: The error message if this job has failed, else None.
+
+        """
+        # Reach out to Kubernetes API to retrieve job logs
+        # TODO: this has not been tested very thoroughly
+
+        LOGGER.debug('KubernetesJob.get_error_message')
+        LOGGER.debug(' >>> Reading error message for: ' + self.job_name)
+
+        pod_name = self.get_pod_name()
         return_val = "Please wait, fetching logs..."
-        if k8s_response is not None:
-            job_pods = k8s_response.json()
-            
-            if len(job_pods['items']) <= 0:
+        if pod_name is not None:
+            if not pod_name:
                 return_val = "Error reading logs"
                 return return_val
-            # FIXME: We assume there is only one matching job
-            job_pod = job_pods['items'][0]
-            pod_name = job_pod['metadata']['name']
-            LOGGER.debug('>>> Got pod name: ' + pod_name)
 
             # Then read and return the logs from that pod
-            logs_url = 'https://' + \
-                KubernetesJob.kubernetes_apiuri + \
-                '/api/v1/namespaces/' + self.namespace + '/pods/' + pod_name + '/log'
+            logs_url = self.get_logs_url(pod_name)
 
             LOGGER.debug('Getting logs from ' + logs_url)
             request_lambda2 = lambda: requests.get(\
@@ -370,6 +389,41 @@ class KubernetesJob(object):
             return_val = "Error reading logs"
         return return_val
 
+    def stream_logs(self, chunk_size=8192):
+        """Yields the logs of this job as they are read from Kubernetes.
+
+        Args:
+            chunk_size (int): The maximum number of bytes per chunk.
+
+        Yields:
+            bytes: The next chunk of the job logs, or a status message if
+                the logs cannot be read.
+
+        """
+        LOGGER.debug('KubernetesJob.stream_logs')
+        LOGGER.debug(' >>> Streaming logs for: ' + self.job_name)
+
+        pod_name = self.get_pod_name()
+        if not pod_name:
+            yield b"Error reading logs"
+            return
+
+        logs_url = self.get_logs_url(pod_name)
+        LOGGER.debug('Streaming logs from ' + logs_url)
+        request_lambda = lambda: requests.get(\
+            logs_url, headers=default_headers, verify=False, stream=True)
+        k8s_response = retry_request_until_ok(request_lambda, 3, 1)
+        if k8s_response is None:
+            yield b"Please wait, fetching logs..."
+            return
+
+        try:
+            for chunk in k8s_response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            k8s_response.close()
+
     def is_done(self):
         """Returns True if the job is done, else returns False. TODO confirm
         behavior if done but deleted.
@@ -516,6 +570,8 @@ def retry_request_until_ok(request_lambda, num_attempts, retry_delay_seconds):
         if ok:
             return_val = response
             break
+        # Release the connection; streamed responses are never read
+        response.close()
         time.sleep(retry_delay_seconds)
     return return_val        
         
@@ -23,7 +23,7 @@ class Graph(AccessControlledModel):
         return graph
 
     def list(self, user=None, limit=0, offset=0,
-             sort=None, currentUser=None):
+             sort=None, currentUser=None, fields=None):
         """List a page of model graph for a given user.
 
         :param user: The user who owns the graph.
@@ -32,12 +32,14 @@ class Graph(AccessControlledModel):
         :param offset: The page offset
         :param sort: The sort field.
         :param currentUser: User for access filtering.
+        :param fields: A projection to apply to the query.
+        :type fields: dict or None
         """
         cursor_def = {}
         if user is not None:
             cursor_def['creatorId'] = user['_id']
 
-        cursor = self.find(cursor_def, sort=sort)
+        cursor = self.find(cursor_def, sort=sort, fields=fields)
         for r in self.filterResultsByPermission(
                 cursor=cursor, user=currentUser, level=AccessType.READ,
                 limit=limit, offset=offset):
@@ -1,18 +1,44 @@
 """Defines the graph API."""
+from girder import logger
 from girder.api import access
 from girder.api.docs import addModel
-from girder.api.rest import Resource, filtermodel, RestException
+from girder.api.rest import Resource, filtermodel, RestException, \
+    setResponseHeader
 from girder.api.describe import Description, autoDescribeRoute
 from girder.constants import SortDir, AccessType
 from ..models.graph import Graph as GraphModel
 from ..utils import fbpToCis, execGraph, getLogs
-import tempfile
+import cherrypy
+import collections
+import hashlib
+import json
+import threading
 import yaml
-import pyaml
-import os
-from yggdrasil.yamlfile import prep_yaml
-from yggdrasil.schema import get_schema
-from yggdrasil.backwards import as_str
+
+try:
+    from yaml import CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeDumper as _SafeDumper
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(data):
+    """Parse JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf8'))
+
+
+def _canonical_json(obj):
+    """Serialize to key-sorted JSON bytes, for use as a cache key."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True).encode('utf8')
+
 
 graphDef = {
     "description": "Object representing a Crops in Silico model graph.",
@@ -71,6 +97,132 @@ graphDef = {
 }
 addModel('graph', graphDef, resources='graph')
 
+graphInputDef = {
+    "description": "A graph to convert or execute.",
+    "required": [
+        "content"
+    ],
+    "properties": {
+        "name": {
+            "type": "string",
+            "description": "A user-friendly name"
+        },
+        "content": {
+            "type": "object",
+            "description": "Graph specification in FBP format"
+        }
+    },
+}
+addModel('graphInput', graphInputDef, resources='graph')
+
+
+_SCHEMA = None
+_schema_lock = threading.Lock()
+
+
+def _get_schema():
+    """Return the yggdrasil schema, built once per process."""
+    global _SCHEMA
+    if _SCHEMA is None:
+        with _schema_lock:
+            if _SCHEMA is None:
+                # yggdrasil is heavy; only load it once a graph is compiled
+                from yggdrasil.schema import get_schema
+                _SCHEMA = get_schema()
+    return _SCHEMA
+
+
+# Compiled graph YAML keyed by a SHA-1 digest of the canonical FBP JSON.
+# The cache is per process: a spec change only clears it in the process
+# that handled the change, so deployments running several Girder
+# processes can serve stale graphs from the others until their entries
+# are evicted.  Run a single process, or restart the others after
+# changing specs.
+_COMPILED_MAXSIZE = 128
+_compiled = collections.OrderedDict()
+_compiled_lock = threading.Lock()
+_compiled_generation = 0
+
+
+def clearGraphCache(event=None):
+    """Drop memoized conversions; bound to spec changes in the plugin."""
+    global _compiled_generation
+    with _compiled_lock:
+        _compiled.clear()
+        _compiled_generation += 1
+
+
+def _dump_yaml(obj):
+    """Serialize to block-style YAML without line wrapping."""
+    return yaml.dump(obj, Dumper=_SafeDumper, default_flow_style=False,
+                     width=2**31 - 1, sort_keys=False, allow_unicode=True)
+
+
+def _prepare_and_validate(cisgraph):
+    """Validate a yggrun graph against the schema without touching disk."""
+    from yggdrasil.yamlfile import prep_yaml
+    yml_prep = prep_yaml(cisgraph)
+
+    s = _get_schema()
+    yml_norm = s.normalize(yml_prep)
+    try:
+        s.validate(yml_norm)
+    except BaseException as e:
+        logger.warning('Invalid graph: %s', e)
+        raise RestException('Invalid graph: %s' % e, 400)
+
+
+def _compile_graph_impl(content):
+    """Compile FBP content to validated yggrun YAML."""
+    try:
+        cisgraph = fbpToCis(content)
+    except ValueError as e:
+        raise RestException('Invalid graph: %s' % e, 400)
+    # Dump first: prep_yaml may annotate the dict it is given
+    yaml_graph = _dump_yaml(cisgraph)
+
+    _prepare_and_validate(cisgraph)
+
+    return yaml_graph
+
+
+def _compile_graph_cached(content):
+    """Compile FBP content, reusing earlier results for the same content.
+
+    Converting and then executing the same graph only compiles it once.
+    Invalid graphs raise and are therefore never cached.
+
+    :param content: The FBP graph content.
+    :type content: dict
+    :returns: The YAML serialization of the yggrun graph.
+    """
+    key = hashlib.sha1(_canonical_json(content)).digest()
+    with _compiled_lock:
+        if key in _compiled:
+            # Re-insert to mark as most recently used
+            yaml_graph = _compiled[key] = _compiled.pop(key)
+            return yaml_graph
+        generation = _compiled_generation
+
+    yaml_graph = _compile_graph_impl(content)
+
+    with _compiled_lock:
+        # Specs changed while compiling; the result may be stale
+        if generation != _compiled_generation:
+            return yaml_graph
+        _compiled[key] = yaml_graph
+        while len(_compiled) > _COMPILED_MAXSIZE:
+            _compiled.popitem(last=False)
+    return yaml_graph
+
+
+def _load_body(body):
+    """Parse a JSON request body."""
+    try:
+        return _json_loads(body.read())
+    except ValueError:
+        raise RestException('Invalid JSON passed in request body.')
+
 
 class Graph(Resource):
     """Defines graph API."""
@@ -109,7 +261,8 @@ class Graph(Resource):
 
         return list(self._model.list(
                 user=user, currentUser=currentUser,
-                offset=offset, limit=limit, sort=sort))
+                offset=offset, limit=limit, sort=sort,
+                fields={'content': False}))
 
     @access.user
     @autoDescribeRoute(
@@ -179,71 +332,39 @@ class Graph(Resource):
     @access.public
     @autoDescribeRoute(
         Description('Convert a graph from FBP to yggrun format.')
-        .jsonParam('graph', 'Name and attributes of the spec.',
-                   paramType='body')
+        .param('graph', 'Name and attributes of the spec.',
+               paramType='body', dataType='graphInput')
         .errorResponse()
         .errorResponse('Not authorized to convert specs.', 403)
     )
     def convertGraph(self, graph):
         """Convert graph."""
-        cisgraph = fbpToCis(graph['content'])
-
-        cisgraph = as_str(cisgraph, recurse=True, allow_pass=True)
-        
-        # Write to temp file and validate
-        tmpfile = tempfile.NamedTemporaryFile(suffix="yml", prefix="cis",
-                                              delete=False)
-        yaml.safe_dump(cisgraph, tmpfile, default_flow_style=False)
-        yml_prep = prep_yaml(tmpfile.name)
-        os.remove(tmpfile.name)
-
-        s = get_schema()
-        yml_norm = s.normalize(yml_prep)
-        try:
-            s.validate(yml_norm)
-        except BaseException as e:
-            print(e)
-            raise RestException('Invalid graph %s', 400, e)
+        graph = _load_body(graph)
+        yaml_graph = _compile_graph_cached(graph['content'])
 
         self.setRawResponse()
-        return pyaml.dump(cisgraph)
+        return yaml_graph
 
     @access.user
     @autoDescribeRoute(
-        Description('Execute yggrun on a graph and return the result.')
-        .jsonParam('graph', 'Name and attributes of the spec.',
-                   paramType='body')
+        Description('Queue yggrun on a graph and return the job name.')
+        .notes('Execution is asynchronous; poll the logs endpoint with the '
+               'returned job name.')
+        .param('graph', 'Name and attributes of the spec.',
+               paramType='body', dataType='graphInput')
         .errorResponse()
         .errorResponse('Not authorized to execute graphs.', 403)
     )
     def executeGraph(self, graph):
         """Execute graph."""
-        cisgraph = fbpToCis(graph['content'])
+        graph = _load_body(graph)
+        yaml_graph = _compile_graph_cached(graph['content'])
 
         user = self.getCurrentUser()
         username = user['login']
 
-        cisgraph = as_str(cisgraph, recurse=True, allow_pass=True)
-        
-        # Write to temp file and validate
-        tmpfile = tempfile.NamedTemporaryFile(suffix="yml", prefix="cis",
-                                              delete=False)
-        yaml.safe_dump(cisgraph, tmpfile, default_flow_style=False)
-        yml_prep = prep_yaml(tmpfile.name)
-        os.remove(tmpfile.name)
-
-        s = get_schema()
-        yml_norm = s.normalize(yml_prep)
-        try:
-            s.validate(yml_norm)
-        except BaseException as e:
-            print(e)
-            raise RestException('Invalid graph %s', 400, e)
-
         self.setRawResponse()
-        yaml_graph = pyaml.dump(cisgraph)
-        
-        #print('Executing graph: ' + str(yaml_graph))
+        cherrypy.response.status = 202
         return execGraph(yaml_graph, username)
         
     @access.user
@@ -262,5 +383,8 @@ class Graph(Resource):
         job_name = name
         job_type = 'k8s.io/yggdrasil'
         
-        #print('Executing graph: ' + str(yaml_graph))
-        return getLogs(job_name, job_type, username)
+        logs = getLogs(job_name, job_type, username)
+
+        self.setRawResponse()
+        setResponseHeader('Content-Type', 'text/plain')
+        return lambda: logs
@@ -9,9 +9,6 @@ from ..models.spec import Spec as SpecModel
 from ..utils import ingest, uiToCis
 import pyaml
 import yaml
-from yggdrasil.yamlfile import prep_yaml
-from yggdrasil.schema import get_schema
-from yggdrasil.backwards import as_str
 import os
 import tempfile
 import cherrypy
@@ -201,6 +198,10 @@ class Spec(Resource):
     )
     def convertSpec(self, spec):
         """Convert spec."""
+        from yggdrasil.yamlfile import prep_yaml
+        from yggdrasil.schema import get_schema
+        from yggdrasil.backwards import as_str
+
         cisspec = uiToCis(spec['content'])
 
         cisspec = as_str(cisspec, recurse=True, allow_pass=True)
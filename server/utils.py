@@ -6,6 +6,8 @@ import yaml
 import urllib
 import shutil
 from models.spec import Spec as SpecModel
+from girder import events, logger
+from girder.plugins.jobs.constants import JobStatus
 from girder.plugins.jobs.models.job import Job as JobModel
 
 import datetime
@@ -59,16 +61,39 @@ def execGraph(yaml_graph, username):
     
     jobModel.save(job_model)
     
-    # Create and run the job
+    # Create the job and hand it to the events daemon to run
     k8s_job = KubernetesJob(username, job_name, namespace, timeout, init_command, command, docker_image, num_cpus, max_ram_mb)
-    if not k8s_job.is_running():
-        jobModel.scheduleJob(job_model)
-        k8s_job.submit()
+    events.daemon.trigger('cis.graph.submit', info={
+        'job': job_model,
+        'k8s_job': k8s_job,
+    })
     
     return job_name
+
+def submitGraphJob(event):
+    """Submit a graph job to Kubernetes from the events daemon.
+
+    Failures are recorded on the Girder job, since the client already got
+    its response and the daemon thread would otherwise swallow them.
+    """
+    job_model = event.info['job']
+    k8s_job = event.info['k8s_job']
+    try:
+        if not k8s_job.is_running():
+            JobModel().scheduleJob(job_model)
+            k8s_job.submit()
+    except Exception as e:
+        logger.exception('Failed to submit graph job %s', job_model['title'])
+        jobModel = JobModel()
+        job_model = jobModel.load(job_model['_id'], force=True)
+        # ERROR is only a valid transition out of an active state
+        if job_model['status'] == JobStatus.INACTIVE:
+            job_model = jobModel.updateJob(job_model, status=JobStatus.QUEUED)
+        jobModel.updateJob(job_model, status=JobStatus.ERROR,
+                           log='Failed to submit job: %s\n' % e)
     
 def getLogs(job_name, job_type, username): 
-    # Create and run the job
+    """Return a generator over the job logs, read as they arrive."""
     timeout = 300
     num_cpus = 2
     max_ram_mb = 8384
@@ -81,7 +106,7 @@ def getLogs(job_name, job_type, username):
         #return 'Job is failed'
     #else:
         #return job.get_error_message() 
-    return job.get_error_message()
+    return job.stream_logs()
 
 def cloneRepo(url, path, branch='master'):
     """Use gitpython to clone the specified repo/branch."""
@@ -183,17 +208,44 @@ def get_label_or_name(obj, use_metadata=True):
         return obj.get('label', obj.get('name', None))
 
     
-def get_graph_port_label_by_name(ports, name):
-    print('Searching %s for %s' % (str(ports), name))
-    ret = None
+def index_graph_ports(ports):
+    """Index (key, port) pairs by lowercase port name; first match wins."""
+    index = {}
     for key,port in ports:
-        if port['name'].lower() == name.lower():
-            ret = port
-            break
+        index.setdefault(port['name'].lower(), port)
+    return index
+
+def get_graph_port_label_by_name(ports, name):
+    """Look up a port in an index built by index_graph_ports."""
+    ret = ports.get(name.lower())
+    if ret is None:
+        raise ValueError('Unknown port %s' % name)
     return ret
 
 def fbpToCis(data):
-    """ Given a flow-based-protocol graph, return in CIS format."""
+    """ Given a flow-based-protocol graph, return in CIS format.
+
+    Each process and connection is checked as it is converted, so a bad
+    node raises ValueError before the full graph is built and validated.
+    """
+    for field in ('processes', 'connections'):
+        if field not in data:
+            raise ValueError('Graph is missing %s' % field)
+
+    for key,process in data['processes'].items():
+        if 'component' not in process:
+            raise ValueError('Process %s has no component' % key)
+
+    # Resolve every component spec in a single query
+    components = set(process['component']
+                     for process in data['processes'].values())
+    components -= set(['inport', 'outport'])
+    specs = {}
+    if components:
+        for spec in SpecModel().find(
+                {'content.name': {'$in': list(components)}}):
+            specs.setdefault(spec['content']['name'], spec)
+
     inports = {}
     outports = {}
     models = {}
@@ -203,6 +255,8 @@ def fbpToCis(data):
             port = {}
             port['path'] = process['metadata']['name']
             port['label'] = process['metadata'].get('label', None)
+            if port['label'] is None:
+                raise ValueError('Port process %s has no label' % key)
             port['name'] = port['label'].lower()
             port['type'] = process['metadata']['type']
             if component == 'inport':
@@ -212,23 +266,25 @@ def fbpToCis(data):
                port['method']  = process['metadata']['write_meth']
                outports[key] = port
         else:
-            spec = SpecModel().findOne({'content.name': component})
+            spec = specs.get(component)
+            if spec is None:
+                raise ValueError('Unknown component %s in process %s' %
+                                 (component, key))
             for inport in spec['content']['inports']:
                 port = {}
                 port['name'] = inport['name']
                 port['label'] = inport['label']
                 inports[port['name']] = port
-            print(inports)                
             for outport in spec['content']['outports']:
                 port = {}
                 port['name'] = outport['name']
                 port['label'] = outport['label']
                 outports[port['name']] = port
-            print(outports)                 
             models[key] = uiToCis(spec['content'])['model']
     
 
-    graph_ports = inports.items() + outports.items()
+    graph_ports = index_graph_ports(
+        list(inports.items()) + list(outports.items()))
     conns = []
     for connection in data['connections']:
         srckey = connection['src']['process']
@@ -247,11 +303,9 @@ def fbpToCis(data):
            conn['filetype'] = outports[tgtkey]['method']
            conn['output'] = outports[tgtkey]['path']
         else:
-           print('Finding source_port: ' + str(connection['src']['port']))
            source_port = get_graph_port_label_by_name(graph_ports, connection['src']['port'])
            conn['input'] = source_port['label']
            
-           print('Finding target_port: ' + str(connection['tgt']['port']))
            target_port = get_graph_port_label_by_name(graph_ports, connection['tgt']['port']) 
            conn['output'] = target_port['label']
            #conn['input'] = connection['src']['port']
@@ -268,7 +322,7 @@ def fbpToCis(data):
 
         conns.append(conn)
 
-    return { "models": models.values(), "connections": conns }
+    return { "models": list(models.values()), "connections": conns }
 
 
 def ingest():